@@ -1,201 +1,22 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-from typing import List, Dict, Optional, Tuple
-import plotly.express as px
-import plotly.graph_objects as go
+from typing import Tuple
 from streamlit.components.v1 import html
-from fuzzywuzzy import process
-import Levenshtein
-import networkx as nx
-from collections import defaultdict
-
-
-class Student:
-    def __init__(self, id: int, name: str):
-        self.id = id
-        self.name = name
-        self.preferred_partners: List[int] = []
-        self.preferred_topic: Optional[str] = None
-        self.secondary_topic: Optional[str] = None
-    
-    def __str__(self):
-        return f"{self.name} (ID: {self.id})"
-
-class Group:
-    def __init__(self, members: List[Student], topic: str, score: float):
-        self.members = members
-        self.topic = topic
-        self.score = score
-    
-    def __str__(self):
-        return f"Emne: {self.topic}, Score: {self.score:.2f}, Medlemmer: {', '.join(str(member) for member in self.members)}"
-
-class GroupFormationSystem:
-    def __init__(self, num_students: int, topics: List[str], student_names: List[str]):
-        self.topics = topics
-        self.students = [Student(i+1, student_names[i]) for i in range(num_students)]
-        self.max_group_size = 4
-    
-    def calculate_pair_score(self, student1: Student, student2: Student) -> float:
-        score = 0.0
-        
-        # Vægtet scoring for partnerprioriteringer
-        priority_weights = {0: 4.0, 1: 2.5, 2: 1.5}  # Eksempel: Første valg=4, andet=2.5, tredje=1.5
-        
-        # Tjek gensidighed og prioritetsniveau
-        s1_priority = None
-        s2_priority = None
-        
-        if student2.id in student1.preferred_partners:
-            s1_priority = student1.preferred_partners.index(student2.id)
-            if s1_priority < 3:  # Kun de første 3 prioriteringer tæller
-                score += priority_weights.get(s1_priority, 0)
-        
-        if student1.id in student2.preferred_partners:
-            s2_priority = student2.preferred_partners.index(student1.id)
-            if s2_priority < 3:
-                score += priority_weights.get(s2_priority, 0)
-        
-        # Gensidighedsbonus baseret på prioritetsforskelle
-        if s1_priority is not None and s2_priority is not None:
-            priority_diff = abs(s1_priority - s2_priority)
-            score += max(3.0 - priority_diff, 0)  # Bonus: 3 for perfekt match, 0 ved stor forskel
-        
-        # Eksisterende emnelogik
-        if student1.preferred_topic == student2.preferred_topic:
-            score += 3.0
-        elif (student1.preferred_topic == student2.secondary_topic or 
-            student1.secondary_topic == student2.preferred_topic):
-            score += 1.5
-        
-        return score
-    
-    def create_score_matrix(self) -> np.ndarray:
-        n_students = len(self.students)
-        matrix = np.zeros((n_students, n_students))
-        
-        for i in range(n_students):
-            for j in range(i+1, n_students):
-                score = self.calculate_pair_score(self.students[i], self.students[j])
-                matrix[i][j] = score
-                matrix[j][i] = score
-        
-        return matrix
-        
-    def find_best_groups(self, score_matrix: np.ndarray) -> List[Group]:
-        unassigned = set(range(len(self.students)))
-        groups = []
-
-        while unassigned:
-            best_group = None
-            best_score = -1
-            best_topic = None
-
-            # Eksisterende logik til at finde den bedste gruppe
-            for size in range(2, min(self.max_group_size + 1, len(unassigned) + 1)):
-                for members in self._get_possible_groups(list(unassigned), size):
-                    if not members:
-                        continue
-                    
-                    score = self._calculate_group_score(members, score_matrix)
-                    topic_counts = {}
-                    
-                    for i in members:
-                        topic = self.students[i].preferred_topic
-                        if topic:
-                            topic_counts[topic] = topic_counts.get(topic, 0) + 1
-                    
-                    if not topic_counts:
-                        continue
-                    
-                    current_topic = max(topic_counts.items(), key=lambda x: x[1])[0]
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_group = members
-                        best_topic = current_topic
-
-            if best_group and best_topic:
-                group_members = [self.students[i] for i in best_group]
-                groups.append(Group(group_members, best_topic, best_score))
-                unassigned -= set(best_group)
-            else:
-                # Ny logik for restgrupper
-                remaining_students = [self.students[i] for i in unassigned]
-                
-                # Gruppér efter emner
-                topic_buckets = defaultdict(list)
-                for student in remaining_students:
-                    if student.preferred_topic:
-                        topic_buckets[student.preferred_topic].append(student)
-                    elif student.secondary_topic:
-                        topic_buckets[student.secondary_topic].append(student)
-                    else:
-                        topic_buckets["Ingen"].append(student)
-
-                # Dan emnebaserede grupper
-                for topic, students in topic_buckets.items():
-                    while students:
-                        best_subgroup = []
-                        best_subscore = -1
-                        
-                        # Find bedste kombination indenfor emnet
-                        for size in range(min(self.max_group_size, len(students)), 1, -1):
-                            for i in range(len(students) - size + 1):
-                                subgroup = students[i:i+size]
-                                indices = [s.id-1 for s in subgroup]
-                                current_score = self._calculate_group_score(indices, score_matrix)
-                                
-                                if current_score > best_subscore:
-                                    best_subscore = current_score
-                                    best_subgroup = subgroup
-
-                        if best_subgroup:
-                            groups.append(Group(best_subgroup, topic, best_subscore))
-                            # Fjern fra både students og unassigned
-                            for s in best_subgroup:
-                                students.remove(s)
-                                unassigned.remove(s.id-1)
-                        else:
-                            # Fallback: Tilfældig gruppe med emnet
-                            group = students[:self.max_group_size]
-                            groups.append(Group(group, topic, 0.0))
-                            for s in group:
-                                unassigned.remove(s.id-1)
-                            students = students[self.max_group_size:]
-                break
-
-        return groups
-
-    def _get_possible_groups(self, students: List[int], size: int) -> List[List[int]]:
-        if size == 1:
-            return [[s] for s in students]
-        
-        groups = []
-        for i in range(len(students)):
-            current = students[i]
-            others = students[i+1:]
-            for subgroup in self._get_possible_groups(others, size-1):
-                groups.append([current] + subgroup)
-        return groups
-    
-    def _calculate_group_score(self, members: List[int], score_matrix: np.ndarray) -> float:
-        score = 0.0
-        for i in range(len(members)):
-            for j in range(i+1, len(members)):
-                score += score_matrix[members[i]][members[j]]
-        return score
-    
-    def set_preferences(self, student_id: int, partner_ids: List[int], primary_topic: str, secondary_topic: str = None):
-        student = next(s for s in self.students if s.id == student_id)
-        student.preferred_partners = partner_ids
-        student.preferred_topic = primary_topic
-        student.secondary_topic = secondary_topic
-
-    def reset_preferences(self):
-        student_names = [student.name for student in self.students]
-        self.students = [Student(i+1, name) for i, name in enumerate(student_names)]
+import os
+from group_formation import MAX_REPEAT_PENALTY, MAX_STUDENTS, GroupFormationSystem
+from pairing_history import DEFAULT_NAME, PairingHistory
+from group_analytics import GroupAnalytics
+from class_snapshot import ClassSnapshot, derived_cache
+
+# pandas, plotly, networkx og fuzzywuzzy importeres først i de funktioner, der bruger dem,
+# så kolde starter og setup-siden ikke betaler for dem. Se import_report.py.
+
+HISTORY_PATH = os.environ.get("GRUPPE_HISTORY_PATH", "pairing_history.npz")
+
+@st.cache_resource
+def get_history() -> PairingHistory:
+    # Én historik pr. proces, delt af alle sessioner; PairingHistory låser selv ved adgang
+    return PairingHistory(HISTORY_PATH)
 
 def initialize_session_state():
     if 'page' not in st.session_state:
@@ -214,11 +35,59 @@ def initialize_session_state():
             "Fysik", "Kemi", "Engelsk", "Samfundsfag", "Geografi"
         ]
     if 'student_names' not in st.session_state:
-        st.session_state.student_names = [f"Elev {i+1}" for i in range(35)]
+        st.session_state.student_names = [DEFAULT_NAME.format(i+1) for i in range(35)]
+    if 'student_keys' not in st.session_state:
+        st.session_state.student_keys = [""] * len(st.session_state.student_names)
     if 'first_visit' not in st.session_state:
         st.session_state.first_visit = True
     if 'guided_tour_step' not in st.session_state:
         st.session_state.guided_tour_step = 0
+    if 'groups_recorded' not in st.session_state:
+        st.session_state.groups_recorded = False
+
+def restore_session_state():
+    # Systemet og grupperne genopbygges fra det kompakte snapshot ved hver kørsel
+    if st.session_state.system is None and st.session_state.get('snapshot'):
+        # Fejl i historikken er ikke snapshottets skyld og skal ikke kassere klassen
+        history = get_history()
+        try:
+            snapshot = ClassSnapshot.from_bytes(st.session_state.snapshot)
+            system = snapshot.to_system(history)
+            groups = snapshot.to_groups(system)
+        except (ValueError, IndexError):
+            # Et ødelagt snapshot må ikke låse sessionen; kassér det og gå tilbage til konfiguration
+            st.session_state.snapshot = None
+            st.session_state.groups = None
+            st.session_state.preferences_set = set()
+            go_to_setup()
+            st.error("Den gemte klasse kunne ikke indlæses og er blevet kasseret")
+            return
+        st.session_state.system = system
+        st.session_state.groups = groups
+        st.session_state.preferences_set = snapshot.preferences_set
+        st.session_state.groups_recorded = snapshot.groups_recorded
+
+def compact_session_state():
+    # Mellem kørsler gemmes kun snapshottet; afledte data ligger i den delte derived_cache
+    if st.session_state.system is None:
+        return
+    snapshot = ClassSnapshot.from_system(
+        st.session_state.system,
+        st.session_state.get('groups'),
+        st.session_state.preferences_set,
+        st.session_state.groups_recorded
+    )
+    st.session_state.snapshot = snapshot.to_bytes()
+    st.session_state.system = None
+    st.session_state.groups = None
+    st.session_state.preferences_set = set()
+
+def class_cache_key(system: GroupFormationSystem) -> str:
+    runs = system.history.runs if system.history is not None else 0
+    return f"{ClassSnapshot.from_system(system).preference_key()}:{runs}"
+
+def get_score_matrix(system: GroupFormationSystem) -> np.ndarray:
+    return derived_cache.get(f"score:{class_cache_key(system)}", system.create_score_matrix)
 
 def go_to_setup():
     st.session_state.page = 'setup'
@@ -301,6 +170,7 @@ def display_student_status(system: GroupFormationSystem, preferences_set: set):
     
     all_names = [s.name for s in system.students]
     if search_query:
+        from fuzzywuzzy import process
         matches = process.extract(search_query, all_names, limit=5)
         filtered_students = [s for s in system.students if s.name in [m[0] for m in matches]]
     else:
@@ -336,58 +206,122 @@ def display_student_status(system: GroupFormationSystem, preferences_set: set):
             </div>
             """, unsafe_allow_html=True)
 
-def show_network_graph(system):
+# Over disse grænser skiftes til WebGL og labels vises kun ved hover
+WEBGL_NODE_THRESHOLD = 150
+LABEL_NODE_THRESHOLD = 60
+EDGE_WEIGHT_BUCKETS = 3
+
+def _partner_edges(system) -> Tuple[np.ndarray, np.ndarray]:
+    index = {s.id: i for i, s in enumerate(system.students)}
+    edges = {}
+    for i, student in enumerate(system.students):
+        for partner in student.preferred_partners:
+            j = index.get(partner)
+            if j is None or j == i:
+                continue
+            key = (min(i, j), max(i, j))
+            if key not in edges:
+                edges[key] = system.calculate_pair_score(student, system.students[j])
+    
+    if not edges:
+        return np.zeros((0, 2), dtype=int), np.zeros(0)
+    return np.array(list(edges.keys()), dtype=int), np.array(list(edges.values()))
+
+def _edge_coordinates(positions: np.ndarray, edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # [x0, x1, NaN] pr. kant, så hele kantlisten bliver én linje-trace
+    coords = np.full((len(edges), 3, 2), np.nan)
+    coords[:, 0] = positions[edges[:, 0]]
+    coords[:, 1] = positions[edges[:, 1]]
+    return coords[:, :, 0].ravel(), coords[:, :, 1].ravel()
+
+def _aggregate_by_topic(system, edges: np.ndarray, weights: np.ndarray):
+    topic_names = list(system.topics) + ["Ingen"]
+    topic_index = {topic: i for i, topic in enumerate(system.topics)}
+    codes = np.array([topic_index.get(s.preferred_topic, len(system.topics)) for s in system.students], dtype=int)
+    
+    present = np.flatnonzero(np.bincount(codes, minlength=len(topic_names)))
+    remap = np.full(len(topic_names), -1, dtype=int)
+    remap[present] = np.arange(len(present))
+    sizes = np.bincount(codes, minlength=len(topic_names))[present]
+    
+    topic_edges = np.sort(remap[codes[edges]], axis=1)
+    cross = topic_edges[:, 0] != topic_edges[:, 1]
+    internal = np.zeros(len(present))
+    np.add.at(internal, topic_edges[~cross, 0], weights[~cross])
+    
+    if cross.any():
+        agg_edges, inverse = np.unique(topic_edges[cross], axis=0, return_inverse=True)
+        agg_weights = np.bincount(inverse.ravel(), weights=weights[cross])
+    else:
+        agg_edges, agg_weights = np.zeros((0, 2), dtype=int), np.zeros(0)
+    
+    labels = [topic_names[t] for t in present]
+    hover = [f"{topic_names[t]}<br>Elever: {sizes[k]}<br>Intern score: {internal[k]:.1f}"
+             for k, t in enumerate(present)]
+    return labels, hover, present, sizes, agg_edges, agg_weights
+
+def show_network_graph(system, aggregate_topics: bool = False):
+    import networkx as nx
+    import plotly.graph_objects as go
+    
     st.subheader("Elevnetværk")
-    G = nx.Graph()
+    edges, weights = _partner_edges(system)
     
-    for student in system.students:
-        G.add_node(student.id, label=student.name, topic=student.preferred_topic)
-        for partner in student.preferred_partners:
-            if partner in [s.id for s in system.students]:
-                partner_student = next(s for s in system.students if s.id == partner)
-                score = system.calculate_pair_score(student, partner_student)
-                G.add_edge(student.id, partner, weight=score)
-    
-    pos = nx.spring_layout(G, seed=42)
-    
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
-    
-    edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
-        line=dict(width=1, color='#888'),
-        hoverinfo='none',
-        mode='lines')
-    
-    node_x = []
-    node_y = []
-    node_text = []
-    node_color = []
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        node_text.append(G.nodes[node]['label'])
-        node_color.append(hash(G.nodes[node]['topic']) % 0xFFFFFF if G.nodes[node]['topic'] else 0xCCCCCC)
-    
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
-        mode='markers+text',
-        text=node_text,
+    if aggregate_topics:
+        labels, hover, node_color, sizes, edges, weights = _aggregate_by_topic(system, edges, weights)
+        node_size = 12 + 30 * np.sqrt(sizes / sizes.max())
+    else:
+        labels = [s.name for s in system.students]
+        hover = labels
+        topic_index = {topic: i for i, topic in enumerate(system.topics)}
+        node_color = np.array([topic_index.get(s.preferred_topic, len(system.topics)) for s in system.students])
+        node_size = 20 if len(labels) <= LABEL_NODE_THRESHOLD else 8
+    
+    n_nodes = len(labels)
+    
+    def compute_layout() -> np.ndarray:
+        G = nx.Graph()
+        G.add_nodes_from(range(n_nodes))
+        G.add_weighted_edges_from((int(a), int(b), float(w)) for (a, b), w in zip(edges, weights))
+        pos = nx.spring_layout(G, seed=42)
+        return np.array([pos[i] for i in range(n_nodes)]).reshape(n_nodes, 2)
+    
+    positions = derived_cache.get(f"layout:{class_cache_key(system)}:{int(aggregate_topics)}", compute_layout)
+    
+    scatter = go.Scattergl if n_nodes > WEBGL_NODE_THRESHOLD else go.Scatter
+    
+    # Én trace pr. vægtinterval i stedet for én pr. kant
+    traces = []
+    if len(edges):
+        thresholds = np.unique(np.quantile(weights, np.linspace(0, 1, EDGE_WEIGHT_BUCKETS + 1)[1:-1]))
+        buckets = np.digitize(weights, thresholds)
+        for bucket in np.unique(buckets):
+            edge_x, edge_y = _edge_coordinates(positions, edges[buckets == bucket])
+            traces.append(scatter(
+                x=edge_x, y=edge_y,
+                line=dict(width=0.5 + bucket, color='#888'),
+                opacity=0.3 + 0.7 * (bucket + 1) / (len(thresholds) + 1),
+                hoverinfo='none',
+                mode='lines'))
+    
+    show_labels = n_nodes <= LABEL_NODE_THRESHOLD
+    traces.append(scatter(
+        x=positions[:, 0], y=positions[:, 1],
+        mode='markers+text' if show_labels else 'markers',
+        text=labels if show_labels else None,
+        hovertext=hover,
+        hoverinfo='text',
         textposition="top center",
         marker=dict(
             showscale=True,
             colorscale='Viridis',
-            size=20,
+            cmin=0,
+            cmax=len(system.topics),
+            size=node_size,
             color=node_color,
-            line_width=2))
+            line_width=2 if show_labels else 0)))
     
-    fig = go.Figure(data=[edge_trace, node_trace],
+    fig = go.Figure(data=traces,
                  layout=go.Layout(
                     showlegend=False,
                     hovermode='closest',
@@ -398,6 +332,27 @@ def show_network_graph(system):
     
     st.plotly_chart(fig, use_container_width=True)
 
+def show_group_analytics(system: GroupFormationSystem, groups, score_matrix: np.ndarray):
+    analytics = GroupAnalytics(system, groups, score_matrix)
+    n_students = len(system.students)
+    hits = analytics.partner_hit_counts
+    topics = analytics.topic_satisfaction_counts
+    
+    with st.expander("⚖️ Tilfredshed og retfærdighed", expanded=True):
+        st.metric("Fik 1. prioritet", f"{hits[1]}/{n_students}")
+        st.metric("Fik en ønsket partner", f"{hits[1:].sum()}/{n_students}")
+        st.metric("Fik primært emne", f"{topics[2]}/{n_students}")
+        if analytics.worst_off_student >= 0:
+            worst = analytics.worst_off_student
+            st.metric("Dårligst stillede placerede elev", system.students[worst].name,
+                      f"{analytics.student_scores[worst]:.1f}", delta_color="off")
+        st.metric("Gini (elevscore)", f"{analytics.score_gini:.2f}",
+                  help="0 = alle elever har samme score, 1 = maksimal ulighed. "
+                       "Negative scorer (fx efter gentagelsesstraf) tælles som 0.")
+        counts, edges = analytics.score_distribution()
+        if counts.sum():
+            st.bar_chart({"Elever": {f"{edges[i]:.1f}": int(c) for i, c in enumerate(counts)}})
+
 def add_keyboard_shortcuts():
     html("""
     <script>
@@ -412,6 +367,25 @@ def add_keyboard_shortcuts():
     </script>
     """)
 
+def apply_name_edits(editor_key: str, target_key: str, column: str):
+    # Anvend alle ændringer fra griddet på én gang; tomme celler beholder den gamle værdi
+    edited_rows = st.session_state[editor_key]["edited_rows"]
+    values = list(st.session_state[target_key])
+    for row, changes in edited_rows.items():
+        value = str(changes.get(column) or "").strip()
+        if value and int(row) < len(values):
+            values[int(row)] = value
+    st.session_state[target_key] = values
+
+def apply_student_edits():
+    # Som apply_name_edits, men et tomt elev-id fjerner id'et i stedet for at beholde det gamle
+    apply_name_edits("students_editor", "student_names", "Navn")
+    keys = list(st.session_state.student_keys)
+    for row, changes in st.session_state["students_editor"]["edited_rows"].items():
+        if "Elev-id" in changes and int(row) < len(keys):
+            keys[int(row)] = str(changes["Elev-id"] or "").strip()
+    st.session_state.student_keys = keys
+
 def setup_page():
     if st.session_state.first_visit:
         with st.expander("Velkommen til GruppeDanner Pro!", expanded=True):
@@ -426,6 +400,8 @@ def setup_page():
                 st.rerun()
         return
 
+    import pandas as pd
+    
     st.title("Gruppedannelsessystem - Konfiguration")
     
     with st.expander("❓ Hjælp til konfiguration", expanded=False):
@@ -441,8 +417,8 @@ def setup_page():
             num_students = st.number_input(
                 "Antal elever", 
                 min_value=2, 
-                max_value=100, 
-                value=st.session_state.num_students,
+                max_value=MAX_STUDENTS, 
+                value=min(st.session_state.num_students, MAX_STUDENTS),
                 key="num_students_input"
             )
             # Opdater session state med den nye værdi
@@ -460,9 +436,11 @@ def setup_page():
     if st.session_state.num_students != len(st.session_state.student_names):
         if st.session_state.num_students > len(st.session_state.student_names):
             for i in range(len(st.session_state.student_names), st.session_state.num_students):
-                st.session_state.student_names.append(f"Elev {i+1}")
+                st.session_state.student_names.append(DEFAULT_NAME.format(i+1))
         else:
             st.session_state.student_names = st.session_state.student_names[:st.session_state.num_students]
+    keys = st.session_state.student_keys[:st.session_state.num_students]
+    st.session_state.student_keys = keys + [""] * (st.session_state.num_students - len(keys))
 
     if num_topics != len(st.session_state.topics):
         if num_topics > len(st.session_state.topics):
@@ -472,45 +450,58 @@ def setup_page():
             st.session_state.topics = st.session_state.topics[:num_topics]
 
     st.subheader("Emner")
-    topics_col1, topics_col2 = st.columns(2)
-    with topics_col1:
-        for i in range((len(st.session_state.topics) + 1) // 2):
-            topic = st.text_input(
-                f"Emne {i+1}", 
-                value=st.session_state.topics[i],
-                key=f"topic_{i}"
-            )
-    with topics_col2:
-        for i in range((len(st.session_state.topics) + 1) // 2, len(st.session_state.topics)):
-            topic = st.text_input(
-                f"Emne {i+1}", 
-                value=st.session_state.topics[i],
-                key=f"topic_{i}"
-            )
+    st.data_editor(
+        pd.DataFrame({"Emne": st.session_state.topics}),
+        key="topics_editor",
+        on_change=apply_name_edits,
+        args=("topics_editor", "topics", "Emne"),
+        num_rows="fixed",
+        hide_index=True,
+        use_container_width=True
+    )
 
     st.subheader("Elevnavne")
-    students_col1, students_col2 = st.columns(2)
-    with students_col1:
-        for i in range((len(st.session_state.student_names) + 1) // 2):
-            name = st.text_input(
-                f"Elev {i+1}", 
-                value=st.session_state.student_names[i],
-                key=f"student_{i}"
-            )
-    with students_col2:
-        for i in range((len(st.session_state.student_names) + 1) // 2, len(st.session_state.student_names)):
-            name = st.text_input(
-                f"Elev {i+1}", 
-                value=st.session_state.student_names[i],
-                key=f"student_{i}"
-            )
+    st.data_editor(
+        pd.DataFrame({"Navn": st.session_state.student_names, "Elev-id": st.session_state.student_keys}),
+        key="students_editor",
+        on_change=apply_student_edits,
+        num_rows="fixed",
+        hide_index=True,
+        use_container_width=True,
+        column_config={"Elev-id": st.column_config.TextColumn(
+            help="Valgfrit, fx UNI-login. Genkender eleven i historikken, selv om navnet staves anderledes")},
+        height=min(35 * (len(st.session_state.student_names) + 1) + 3, 600)
+    )
+
+    uploaded = st.file_uploader("Indlæs gemt klasse", type="npz", help="Fortsæt med en klasse gemt fra hovedsiden")
+    if uploaded is not None and st.button("Åbn gemt klasse", key="load_snapshot_btn"):
+        try:
+            snapshot = ClassSnapshot.from_bytes(uploaded.getvalue())
+        except ValueError as e:
+            st.error(f"Filen er ikke en gyldig gemt klasse: {e}")
+        else:
+            st.session_state.snapshot = snapshot.to_bytes()
+            st.session_state.system = None
+            st.session_state.groups = None
+            # Konfigurationen skal afspejle den indlæste klasse, ellers overskriver
+            # "Start konfiguration" den med den gamle liste
+            st.session_state.num_students = len(snapshot.names)
+            st.session_state.student_names = snapshot.names.tolist()
+            st.session_state.student_keys = snapshot.keys.tolist()
+            st.session_state.topics = list(snapshot.topics)
+            go_to_main()
+            st.rerun()
 
     if st.button("Start konfiguration ⏎", key="start_btn") or st.session_state.get("enter_pressed"):
         st.session_state.system = GroupFormationSystem(
             st.session_state.num_students,
             st.session_state.topics,
-            st.session_state.student_names
+            st.session_state.student_names,
+            history=get_history(),
+            student_keys=st.session_state.student_keys
         )
+        st.session_state.groups = None
+        st.session_state.groups_recorded = False
         st.session_state.preferences_set = set()
         go_to_main()
         st.rerun()
@@ -635,6 +626,30 @@ def main_page():
         st.header("Indstillinger")
         theme = st.selectbox("Tema", ["Automatisk", "Lyst", "Mørkt"], index=0)
         high_contrast = st.toggle("Høj kontrast tilstand")
+        st.session_state.system.repeat_penalty = st.slider(
+            "Straf for gentagne grupper",
+            min_value=0.0,
+            max_value=MAX_REPEAT_PENALTY,
+            value=st.session_state.system.repeat_penalty,
+            step=0.5,
+            help="Trækkes fra parscoren for hver tidligere termin, eleverne har været i gruppe sammen"
+        )
+        aggregate_topics = st.toggle(
+            "Saml netværk efter emne",
+            help="Viser én knude pr. emne i stedet for én pr. elev - anbefales ved store hold"
+        )
+        st.download_button(
+            "💾 Gem klasse",
+            data=ClassSnapshot.from_system(
+                st.session_state.system,
+                st.session_state.get("groups"),
+                st.session_state.preferences_set,
+                st.session_state.groups_recorded
+            ).to_bytes(),
+            file_name="klasse.npz",
+            mime="application/octet-stream",
+            help="Gemmer elever, præferencer og grupper, så klassen kan indlæses senere"
+        )
         if high_contrast:
             st.markdown('<style>[data-high-contrast="true"] { filter: contrast(1.4); }</style>', unsafe_allow_html=True)
         
@@ -695,9 +710,10 @@ def main_page():
                  type="secondary",
                  help="Start gruppedannelsesprocessen"):
         with st.spinner("Analyserer præferencer..."):
-            score_matrix = st.session_state.system.create_score_matrix()
+            score_matrix = get_score_matrix(st.session_state.system)
             groups = st.session_state.system.find_best_groups(score_matrix)
             st.session_state.groups = groups
+            st.session_state.groups_recorded = False
             
             st.subheader("Grupperesultat")
             for i, group in enumerate(groups, 1):
@@ -710,16 +726,35 @@ def main_page():
             st.subheader("Live Dashboard")
             cols = st.columns([2, 1])
             with cols[0]:
-                show_network_graph(st.session_state.system)
+                show_network_graph(st.session_state.system, aggregate_topics)
             with cols[1]:
                 with st.expander("📊 Statusoversigt", expanded=True):
                     st.metric("Grupper dannet", len(groups))
                     st.metric("Gennemsnitlig score", f"{sum(g.score for g in groups)/len(groups):.1f}" if groups else "0.0")
                     st.progress(progress)
+                show_group_analytics(st.session_state.system, groups, score_matrix)
             
             if len([m for g in groups for m in g.members]) < len(st.session_state.system.students):
                 st.warning(f"{len(st.session_state.system.students) - len([m for g in groups for m in g.members])} elever kunne ikke placeres")
     
+    # Hver gruppering registreres kun én gang; "Dan grupper" nulstiller markeringen
+    if st.session_state.get("groups") and not st.session_state.groups_recorded:
+        if st.button("💾 Gem grupper i historik",
+                     key="save_history",
+                     type="secondary",
+                     help="Gemmer grupperne, så de samme elever undgår at komme sammen igen næste termin. "
+                          "Standardnavne som 'Elev 1' gemmes ikke."):
+            history = get_history()
+            duplicates = history.record_groups(st.session_state.groups)
+            history.save(HISTORY_PATH)
+            st.session_state.groups_recorded = True
+            show_animated_success(f"Grupper gemt i historik ({history.runs} kørsler i alt)")
+            if duplicates:
+                st.warning("Flere elever deler navn eller elev-id og blev ikke gemt: "
+                           f"{', '.join(duplicates)}. Giv dem hvert sit elev-id under konfiguration.")
+    elif st.session_state.get("groups"):
+        st.caption("Denne gruppering er gemt i historikken")
+    
     # Tema-håndtering
     theme_js = f"""
     <script>
@@ -836,11 +871,14 @@ def main():
     """, unsafe_allow_html=True)
 
     initialize_session_state()
+    restore_session_state()
     
     if st.session_state.page == 'setup':
         setup_page()
     else:
         main_page()
+    
+    compact_session_state()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,273 @@
+import hashlib
+import io
+import os
+import threading
+import zipfile
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from group_formation import MAX_GROUP_SIZE, MAX_REPEAT_PENALTY, MAX_STUDENTS, Group, GroupFormationSystem
+from pairing_history import PairingHistory
+
+
+class ClassSnapshot:
+    # Kompakt repræsentation af en klasse: emner gemmes én gang, og alt andet er heltalsarrays.
+    # Elev-id'er antages at være position + 1, som GroupFormationSystem tildeler dem.
+    def __init__(self, names: np.ndarray, topics: List[str], topic_table: List[str],
+                 primary: np.ndarray, secondary: np.ndarray,
+                 partner_offsets: np.ndarray, partner_indices: np.ndarray,
+                 group_offsets: np.ndarray, group_members: np.ndarray,
+                 group_topics: np.ndarray, group_scores: np.ndarray,
+                 submitted: np.ndarray, max_group_size: int, repeat_penalty: float,
+                 groups_recorded: bool = False, keys: Optional[np.ndarray] = None):
+        self.names = names
+        # Valgfrie elev-id'er; tom tekst = intet id (ældre snapshots har ingen)
+        self.keys = keys if keys is not None else np.full(len(names), "", dtype=str)
+        self.topics = topics
+        self.topic_table = topic_table
+        self.primary = primary
+        self.secondary = secondary
+        self.partner_offsets = partner_offsets
+        self.partner_indices = partner_indices
+        self.group_offsets = group_offsets
+        self.group_members = group_members
+        self.group_topics = group_topics
+        self.group_scores = group_scores
+        self.submitted = submitted
+        self.max_group_size = max_group_size
+        self.repeat_penalty = repeat_penalty
+        # Om grupperne allerede er registreret i pardannelseshistorikken
+        self.groups_recorded = groups_recorded
+
+    @classmethod
+    def from_system(cls, system: GroupFormationSystem, groups: Optional[List[Group]] = None,
+                    preferences_set: Optional[Iterable[int]] = None,
+                    groups_recorded: bool = False) -> "ClassSnapshot":
+        groups = groups or []
+        # Emnetabel: klassens emner først, derefter fx "Ingen" fra restgrupper
+        topic_table = list(system.topics)
+        topic_index = {topic: i for i, topic in enumerate(topic_table)}
+        for group in groups:
+            if group.topic not in topic_index:
+                topic_index[group.topic] = len(topic_table)
+                topic_table.append(group.topic)
+
+        def code(topic: Optional[str]) -> int:
+            return topic_index.get(topic, -1) if topic is not None else -1
+
+        n_students = len(system.students)
+        partner_counts = [len(s.preferred_partners) for s in system.students]
+        submitted = np.zeros(n_students, dtype=bool)
+        submitted[[i - 1 for i in (preferences_set or []) if 1 <= i <= n_students]] = True
+
+        return cls(
+            names=np.array([s.name for s in system.students], dtype=str),
+            keys=np.array([s.key or "" for s in system.students], dtype=str),
+            topics=list(system.topics),
+            topic_table=topic_table,
+            primary=np.array([code(s.preferred_topic) for s in system.students], dtype=np.int16),
+            secondary=np.array([code(s.secondary_topic) for s in system.students], dtype=np.int16),
+            partner_offsets=np.concatenate(([0], np.cumsum(partner_counts))).astype(np.int32),
+            partner_indices=np.array([p - 1 for s in system.students for p in s.preferred_partners], dtype=np.int32),
+            group_offsets=np.concatenate(([0], np.cumsum([len(g.members) for g in groups]))).astype(np.int32),
+            group_members=np.array([m.id - 1 for g in groups for m in g.members], dtype=np.int32),
+            group_topics=np.array([topic_index[g.topic] for g in groups], dtype=np.int16),
+            group_scores=np.array([g.score for g in groups], dtype=np.float64),
+            submitted=submitted,
+            max_group_size=system.max_group_size,
+            repeat_penalty=system.repeat_penalty,
+            groups_recorded=groups_recorded
+        )
+
+    def to_system(self, history: Optional[PairingHistory] = None) -> GroupFormationSystem:
+        names = self.names.tolist()
+        system = GroupFormationSystem(len(names), list(self.topics), names, history=history,
+                                      student_keys=self.keys.tolist())
+        system.max_group_size = self.max_group_size
+        system.repeat_penalty = self.repeat_penalty
+        for i, student in enumerate(system.students):
+            start, end = self.partner_offsets[i], self.partner_offsets[i+1]
+            student.preferred_partners = (self.partner_indices[start:end] + 1).tolist()
+            student.preferred_topic = self.topic_table[self.primary[i]] if self.primary[i] >= 0 else None
+            student.secondary_topic = self.topic_table[self.secondary[i]] if self.secondary[i] >= 0 else None
+        return system
+
+    def to_groups(self, system: GroupFormationSystem) -> List[Group]:
+        groups = []
+        for g in range(len(self.group_topics)):
+            members = self.group_members[self.group_offsets[g]:self.group_offsets[g+1]]
+            groups.append(Group([system.students[i] for i in members],
+                                self.topic_table[self.group_topics[g]],
+                                float(self.group_scores[g])))
+        return groups
+
+    @property
+    def preferences_set(self) -> Set[int]:
+        return set((np.flatnonzero(self.submitted) + 1).tolist())
+
+    def preference_key(self) -> str:
+        # Identificerer alt, som scorematrixen afhænger af (grupperne indgår ikke)
+        digest = hashlib.sha1()
+        digest.update("\x1f".join(self.names.tolist()).encode("utf-8"))
+        digest.update("\x1f".join(self.keys.tolist()).encode("utf-8"))
+        digest.update("\x1f".join(self.topics).encode("utf-8"))
+        for array in (self.primary, self.secondary, self.partner_offsets, self.partner_indices):
+            digest.update(array.tobytes())
+        digest.update(repr(self.repeat_penalty).encode("utf-8"))
+        return digest.hexdigest()
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            names=self.names,
+            keys=self.keys,
+            topics=np.array(self.topics, dtype=str),
+            topic_table=np.array(self.topic_table, dtype=str),
+            primary=self.primary,
+            secondary=self.secondary,
+            partner_offsets=self.partner_offsets,
+            partner_indices=self.partner_indices,
+            group_offsets=self.group_offsets,
+            group_members=self.group_members,
+            group_topics=self.group_topics,
+            group_scores=self.group_scores,
+            submitted=self.submitted,
+            settings=np.array([self.max_group_size, self.repeat_penalty, self.groups_recorded], dtype=np.float64)
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ClassSnapshot":
+        # Data kan komme fra en uploadet fil, så alt valideres; fejl giver ValueError
+        try:
+            with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+                fields = {key: arrays[key] for key in SNAPSHOT_FIELDS}
+                if "keys" in arrays.files:
+                    fields["keys"] = arrays["keys"]
+        except KeyError as e:
+            raise ValueError(f"Snapshot mangler feltet {e}")
+        except (OSError, EOFError, ValueError, zipfile.BadZipFile, AttributeError, TypeError) as e:
+            # AttributeError/TypeError: filen var et enkelt .npy-array i stedet for et .npz-arkiv
+            raise ValueError(f"Snapshot kan ikke læses: {e}")
+
+        settings = _validate_fields(fields)
+        return cls(
+            names=fields["names"],
+            keys=fields.get("keys"),
+            topics=fields["topics"].tolist(),
+            topic_table=fields["topic_table"].tolist(),
+            primary=fields["primary"],
+            secondary=fields["secondary"],
+            partner_offsets=fields["partner_offsets"],
+            partner_indices=fields["partner_indices"],
+            group_offsets=fields["group_offsets"],
+            group_members=fields["group_members"],
+            group_topics=fields["group_topics"],
+            group_scores=fields["group_scores"],
+            submitted=fields["submitted"],
+            max_group_size=int(settings[0]),
+            repeat_penalty=float(settings[1]),
+            groups_recorded=bool(settings[2]) if len(settings) > 2 else False
+        )
+
+
+SNAPSHOT_FIELDS = (
+    "names", "topics", "topic_table", "primary", "secondary", "partner_offsets", "partner_indices",
+    "group_offsets", "group_members", "group_topics", "group_scores", "submitted", "settings",
+)
+
+def _check_vector(fields: Dict[str, np.ndarray], name: str, length: Optional[int] = None, kind: str = "i"):
+    array = fields[name]
+    if array.ndim != 1 or array.dtype.kind not in kind:
+        raise ValueError(f"'{name}' har forkert form eller type")
+    if length is not None and len(array) != length:
+        raise ValueError(f"'{name}' har længde {len(array)}, forventede {length}")
+
+def _check_offsets(fields: Dict[str, np.ndarray], offsets: str, indices: str, upper: int):
+    starts, values = fields[offsets], fields[indices]
+    if starts[0] != 0 or np.any(np.diff(starts) < 0) or starts[-1] != len(values):
+        raise ValueError(f"'{offsets}' skal starte i 0, være ikke-faldende og slutte ved længden af '{indices}'")
+    if len(values) and (values.min() < 0 or values.max() >= upper):
+        raise ValueError(f"'{indices}' indeholder indeks uden for 0..{upper - 1}")
+
+def _validate_fields(fields: Dict[str, np.ndarray]) -> np.ndarray:
+    _check_vector(fields, "names", kind="U")
+    n_students = len(fields["names"])
+    if not 2 <= n_students <= MAX_STUDENTS:
+        raise ValueError(f"Snapshot skal indeholde mellem 2 og {MAX_STUDENTS} elever")
+    if "keys" in fields:
+        _check_vector(fields, "keys", n_students, kind="U")
+
+    _check_vector(fields, "topics", kind="U")
+    _check_vector(fields, "topic_table", kind="U")
+    n_topics, n_table = len(fields["topics"]), len(fields["topic_table"])
+    if n_topics < 1 or fields["topic_table"][:n_topics].tolist() != fields["topics"].tolist():
+        raise ValueError("'topic_table' skal starte med klassens emner")
+
+    for name in ("primary", "secondary"):
+        _check_vector(fields, name, n_students)
+        if len(fields[name]) and (fields[name].min() < -1 or fields[name].max() >= n_topics):
+            raise ValueError(f"'{name}' indeholder ukendte emnekoder")
+
+    _check_vector(fields, "partner_offsets", n_students + 1)
+    _check_vector(fields, "partner_indices")
+    _check_offsets(fields, "partner_offsets", "partner_indices", n_students)
+
+    _check_vector(fields, "group_topics")
+    n_groups = len(fields["group_topics"])
+    if n_groups and (fields["group_topics"].min() < 0 or fields["group_topics"].max() >= n_table):
+        raise ValueError("'group_topics' indeholder ukendte emnekoder")
+    _check_vector(fields, "group_scores", n_groups, kind="f")
+    if not np.all(np.isfinite(fields["group_scores"])):
+        raise ValueError("'group_scores' skal være endelige tal")
+    _check_vector(fields, "group_offsets", n_groups + 1)
+    _check_vector(fields, "group_members")
+    _check_offsets(fields, "group_offsets", "group_members", n_students)
+    if len(np.unique(fields["group_members"])) != len(fields["group_members"]):
+        raise ValueError("En elev optræder i flere grupper")
+
+    _check_vector(fields, "submitted", n_students, kind="b")
+
+    settings = fields["settings"]
+    if settings.ndim != 1 or len(settings) not in (2, 3) or not np.all(np.isfinite(settings)):
+        raise ValueError("'settings' er ugyldig")
+    if settings[0] != int(settings[0]) or not 2 <= settings[0] <= MAX_GROUP_SIZE:
+        raise ValueError(f"'settings' skal have max_group_size mellem 2 og {MAX_GROUP_SIZE}")
+    if not 0 <= settings[1] <= MAX_REPEAT_PENALTY:
+        raise ValueError(f"'settings' skal have repeat_penalty mellem 0 og {MAX_REPEAT_PENALTY:g}")
+    return settings
+
+
+class DerivedCache:
+    # Afledte data (scorematrix, layout) deles af alle sessioner og kan altid genberegnes,
+    # så de ældste smides ud, når budgettet er brugt op
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = compute()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self.nbytes += value.nbytes
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+derived_cache = DerivedCache(int(os.environ.get("GRUPPE_DERIVED_CACHE_MB", "256")) * 2**20)
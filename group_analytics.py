@@ -0,0 +1,99 @@
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+def preference_arrays(system) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Partnerrang (1-3, 0 = ikke valgt) samt emnekoder pr. elev (-1 = intet emne)
+    n_students = len(system.students)
+    index = {s.id: i for i, s in enumerate(system.students)}
+    topic_index = {topic: i for i, topic in enumerate(system.topics)}
+
+    rows, cols, ranks = [], [], []
+    for i, student in enumerate(system.students):
+        for rank, partner in enumerate(student.preferred_partners[:3]):
+            j = index.get(partner)
+            if j is not None and j != i:
+                rows.append(i)
+                cols.append(j)
+                ranks.append(rank + 1)
+    partner_rank = np.zeros((n_students, n_students), dtype=np.int8)
+    partner_rank[rows, cols] = ranks
+
+    primary = np.array([topic_index.get(s.preferred_topic, -1) for s in system.students], dtype=int)
+    secondary = np.array([topic_index.get(s.secondary_topic, -1) for s in system.students], dtype=int)
+    return partner_rank, primary, secondary
+
+def membership_matrix(system, groups: List) -> np.ndarray:
+    index = {s.id: i for i, s in enumerate(system.students)}
+    membership = np.zeros((len(system.students), len(groups)), dtype=bool)
+    for g, group in enumerate(groups):
+        membership[[index[m.id] for m in group.members], g] = True
+    return membership
+
+def gini(values: np.ndarray) -> float:
+    # Gini er kun defineret for ikke-negative værdier; negative scorer (fx efter
+    # gentagelsesstraf) tælles som 0 i stedet for at forskyde hele fordelingen
+    values = np.sort(np.maximum(np.asarray(values, dtype=float), 0.0))
+    total = values.sum()
+    if total == 0:
+        return 0.0
+    n = len(values)
+    return float(2 * np.sum(np.arange(1, n + 1) * values) / (n * total) - (n + 1) / n)
+
+class GroupAnalytics:
+    def __init__(self, system, groups: List, score_matrix: Optional[np.ndarray] = None,
+                 preferences: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None):
+        if score_matrix is None:
+            score_matrix = system.create_score_matrix()
+        # Præferencearrays ændrer sig ikke mellem solver-opdateringer og kan genbruges
+        partner_rank, primary, secondary = preferences or preference_arrays(system)
+
+        self.membership = membership_matrix(system, groups)
+        self.placed = self.membership.any(axis=1)
+
+        # Hver elev er i højst én gruppe, så sammenligning af gruppenumre giver co-medlemskab
+        self.group_of = np.where(self.placed, self.membership.argmax(axis=1) if len(groups) else -1, -1)
+        together = (self.group_of[:, None] == self.group_of[None, :]) & self.placed[:, None]
+        np.fill_diagonal(together, False)
+
+        # Bedste opnåede partnerrang pr. elev: 1-3, 0 hvis ingen ønsket partner i gruppen
+        hits = np.where(together & (partner_rank > 0), partner_rank, np.iinfo(np.int8).max)
+        best = hits.min(axis=1) if len(hits) else np.zeros(0, dtype=np.int8)
+        self.partner_hit_rank = np.where(best == np.iinfo(np.int8).max, 0, best).astype(np.int8)
+
+        # Emnetilfredshed: 2 = primært emne, 1 = sekundært, 0 = andet eller ikke placeret
+        topic_index = {topic: i for i, topic in enumerate(system.topics)}
+        group_topics = np.array([topic_index.get(g.topic, -1) for g in groups], dtype=int)
+        assigned_topic = np.full(len(self.placed), -1)
+        assigned_topic[self.placed] = group_topics[self.group_of[self.placed]]
+        self.topic_satisfaction = np.select(
+            [(assigned_topic >= 0) & (assigned_topic == primary),
+             (assigned_topic >= 0) & (assigned_topic == secondary)],
+            [2, 1], 0).astype(np.int8)
+
+        self.group_scores = np.array([g.score for g in groups], dtype=float)
+        self.student_scores = np.where(together, score_matrix, 0.0).sum(axis=1)
+
+    @property
+    def partner_hit_counts(self) -> np.ndarray:
+        # Antal elever der fik ingen / 1. / 2. / 3. prioritet
+        return np.bincount(self.partner_hit_rank, minlength=4)
+
+    @property
+    def topic_satisfaction_counts(self) -> np.ndarray:
+        return np.bincount(self.topic_satisfaction, minlength=3)
+
+    @property
+    def worst_off_student(self) -> int:
+        # Kun placerede elever; ikke-placerede har score 0 uden at have fået en gruppe
+        placed = np.flatnonzero(self.placed)
+        if not len(placed):
+            return -1
+        return int(placed[np.argmin(self.student_scores[placed])])
+
+    @property
+    def score_gini(self) -> float:
+        return gini(self.student_scores[self.placed])
+
+    def score_distribution(self, bins: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        return np.histogram(self.student_scores[self.placed], bins=bins)
@@ -0,0 +1,252 @@
+import numpy as np
+from typing import List, Optional
+from collections import defaultdict
+from pairing_history import PairingHistory
+from seeding import improve_partition, spectral_partition
+
+# Største klasse, som den spektrale opstart (n x n eigh) og scorematrixen håndterer på få sekunder
+MAX_STUDENTS = 2000
+# Den grådige søgning opremser alle delmængder op til denne størrelse; 5 tager få sekunder ved 40 elever
+MAX_GROUP_SIZE = 5
+# Øvre grænse for gentagelsesstraffen (skyderen i appen går til samme værdi)
+MAX_REPEAT_PENALTY = 5.0
+
+class Student:
+    def __init__(self, id: int, name: str, key: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.key = key or None  # Valgfrit elev-id (fx UNI-login), identitet i pardannelseshistorikken
+        self.preferred_partners: List[int] = []
+        self.preferred_topic: Optional[str] = None
+        self.secondary_topic: Optional[str] = None
+    
+    def __str__(self):
+        return f"{self.name} (ID: {self.id})"
+
+class Group:
+    def __init__(self, members: List[Student], topic: str, score: float):
+        self.members = members
+        self.topic = topic
+        self.score = score
+    
+    def __str__(self):
+        return f"Emne: {self.topic}, Score: {self.score:.2f}, Medlemmer: {', '.join(str(member) for member in self.members)}"
+
+class GroupFormationSystem:
+    def __init__(self, num_students: int, topics: List[str], student_names: List[str],
+                 history: Optional[PairingHistory] = None,
+                 student_keys: Optional[List[Optional[str]]] = None):
+        self.topics = topics
+        self.students = [Student(i+1, student_names[i], student_keys[i] if student_keys else None)
+                         for i in range(num_students)]
+        self.max_group_size = 4
+        self.history = history
+        self.repeat_penalty = 2.0  # Fratrækkes pr. tidligere fælles gruppe
+        self.seeding_threshold = 40  # Over dette antal elever startes fra en spektral opdeling
+    
+    def calculate_pair_score(self, student1: Student, student2: Student) -> float:
+        score = 0.0
+        
+        # Vægtet scoring for partnerprioriteringer
+        priority_weights = {0: 4.0, 1: 2.5, 2: 1.5}  # Eksempel: Første valg=4, andet=2.5, tredje=1.5
+        
+        # Tjek gensidighed og prioritetsniveau
+        s1_priority = None
+        s2_priority = None
+        
+        if student2.id in student1.preferred_partners:
+            s1_priority = student1.preferred_partners.index(student2.id)
+            if s1_priority < 3:  # Kun de første 3 prioriteringer tæller
+                score += priority_weights.get(s1_priority, 0)
+        
+        if student1.id in student2.preferred_partners:
+            s2_priority = student2.preferred_partners.index(student1.id)
+            if s2_priority < 3:
+                score += priority_weights.get(s2_priority, 0)
+        
+        # Gensidighedsbonus baseret på prioritetsforskelle
+        if s1_priority is not None and s2_priority is not None:
+            priority_diff = abs(s1_priority - s2_priority)
+            score += max(3.0 - priority_diff, 0)  # Bonus: 3 for perfekt match, 0 ved stor forskel
+        
+        # Eksisterende emnelogik
+        if student1.preferred_topic == student2.preferred_topic:
+            score += 3.0
+        elif (student1.preferred_topic == student2.secondary_topic or 
+            student1.secondary_topic == student2.preferred_topic):
+            score += 1.5
+        
+        return score
+    
+    def create_score_matrix(self) -> np.ndarray:
+        n_students = len(self.students)
+        matrix = np.zeros((n_students, n_students))
+        
+        for i in range(n_students):
+            for j in range(i+1, n_students):
+                score = self.calculate_pair_score(self.students[i], self.students[j])
+                matrix[i][j] = score
+                matrix[j][i] = score
+        
+        # Straf par, der har været i gruppe sammen i tidligere terminer
+        if self.history is not None and self.repeat_penalty:
+            matrix -= self.repeat_penalty * self.history.pair_counts(self.students)
+        
+        return matrix
+        
+    def seed_groups(self, score_matrix: np.ndarray) -> List[List[int]]:
+        return spectral_partition(score_matrix, self.max_group_size)
+
+    def find_best_groups(self, score_matrix: np.ndarray,
+                         initial_groups: Optional[List[List[int]]] = None) -> List[Group]:
+        # Den grådige søgning afprøver alle kombinationer pr. runde og skalerer dårligt,
+        # så store klasser starter i stedet fra en spektral opdeling og forbedres med byt
+        if initial_groups is None and len(self.students) > self.seeding_threshold:
+            initial_groups = self.seed_groups(score_matrix)
+        if initial_groups is not None:
+            self._validate_partition(initial_groups)
+            return self._groups_from_partition(improve_partition(initial_groups, score_matrix), score_matrix)
+
+        unassigned = set(range(len(self.students)))
+        groups = []
+
+        while unassigned:
+            best_group = None
+            best_score = float("-inf")
+            best_topic = None
+
+            # Eksisterende logik til at finde den bedste gruppe
+            for size in range(2, min(self.max_group_size + 1, len(unassigned) + 1)):
+                for members in self._get_possible_groups(list(unassigned), size):
+                    if not members:
+                        continue
+                    
+                    score = self._calculate_group_score(members, score_matrix)
+                    topic_counts = {}
+                    
+                    for i in members:
+                        topic = self.students[i].preferred_topic
+                        if topic:
+                            topic_counts[topic] = topic_counts.get(topic, 0) + 1
+                    
+                    if not topic_counts:
+                        continue
+                    
+                    current_topic = max(topic_counts.items(), key=lambda x: x[1])[0]
+                    
+                    if score > best_score:
+                        best_score = score
+                        best_group = members
+                        best_topic = current_topic
+
+            if best_group and best_topic:
+                group_members = [self.students[i] for i in best_group]
+                groups.append(Group(group_members, best_topic, best_score))
+                unassigned -= set(best_group)
+            else:
+                # Ny logik for restgrupper
+                remaining_students = [self.students[i] for i in unassigned]
+                
+                # Gruppér efter emner
+                topic_buckets = defaultdict(list)
+                for student in remaining_students:
+                    if student.preferred_topic:
+                        topic_buckets[student.preferred_topic].append(student)
+                    elif student.secondary_topic:
+                        topic_buckets[student.secondary_topic].append(student)
+                    else:
+                        topic_buckets["Ingen"].append(student)
+
+                # Dan emnebaserede grupper
+                for topic, students in topic_buckets.items():
+                    while students:
+                        best_subgroup = []
+                        best_subscore = float("-inf")
+                        
+                        # Find bedste kombination indenfor emnet
+                        for size in range(min(self.max_group_size, len(students)), 1, -1):
+                            for i in range(len(students) - size + 1):
+                                subgroup = students[i:i+size]
+                                indices = [s.id-1 for s in subgroup]
+                                current_score = self._calculate_group_score(indices, score_matrix)
+                                
+                                if current_score > best_subscore:
+                                    best_subscore = current_score
+                                    best_subgroup = subgroup
+
+                        if best_subgroup:
+                            groups.append(Group(best_subgroup, topic, best_subscore))
+                            # Fjern fra både students og unassigned
+                            for s in best_subgroup:
+                                students.remove(s)
+                                unassigned.remove(s.id-1)
+                        else:
+                            # Fallback: Tilfældig gruppe med emnet
+                            group = students[:self.max_group_size]
+                            groups.append(Group(group, topic, 0.0))
+                            for s in group:
+                                unassigned.remove(s.id-1)
+                            students = students[self.max_group_size:]
+                break
+
+        return groups
+
+    def _validate_partition(self, partition: List[List[int]]):
+        n_students = len(self.students)
+        seen = [False] * n_students
+        for members in partition:
+            if len(members) > self.max_group_size:
+                raise ValueError(f"Gruppe med {len(members)} elever overstiger max_group_size ({self.max_group_size})")
+            for i in members:
+                if not 0 <= i < n_students:
+                    raise ValueError(f"Ukendt elevindeks i startopdeling: {i}")
+                if seen[i]:
+                    raise ValueError(f"Elevindeks {i} optræder mere end én gang i startopdelingen")
+                seen[i] = True
+        missing = [i for i, placed in enumerate(seen) if not placed]
+        if missing:
+            raise ValueError(f"Startopdelingen mangler {len(missing)} elev(er), fx indeks {missing[0]}")
+
+    def _groups_from_partition(self, partition: List[List[int]], score_matrix: np.ndarray) -> List[Group]:
+        groups = []
+        for members in partition:
+            if not members:
+                continue
+            topic_counts = {}
+            for i in members:
+                topic = self.students[i].preferred_topic or self.students[i].secondary_topic
+                if topic:
+                    topic_counts[topic] = topic_counts.get(topic, 0) + 1
+            topic = max(topic_counts.items(), key=lambda x: x[1])[0] if topic_counts else "Ingen"
+            group_members = [self.students[i] for i in members]
+            groups.append(Group(group_members, topic, self._calculate_group_score(members, score_matrix)))
+        return groups
+
+    def _get_possible_groups(self, students: List[int], size: int) -> List[List[int]]:
+        if size == 1:
+            return [[s] for s in students]
+        
+        groups = []
+        for i in range(len(students)):
+            current = students[i]
+            others = students[i+1:]
+            for subgroup in self._get_possible_groups(others, size-1):
+                groups.append([current] + subgroup)
+        return groups
+    
+    def _calculate_group_score(self, members: List[int], score_matrix: np.ndarray) -> float:
+        score = 0.0
+        for i in range(len(members)):
+            for j in range(i+1, len(members)):
+                score += score_matrix[members[i]][members[j]]
+        return score
+    
+    def set_preferences(self, student_id: int, partner_ids: List[int], primary_topic: str, secondary_topic: str = None):
+        student = next(s for s in self.students if s.id == student_id)
+        student.preferred_partners = partner_ids
+        student.preferred_topic = primary_topic
+        student.secondary_topic = secondary_topic
+
+    def reset_preferences(self):
+        student_names = [student.name for student in self.students]
+        self.students = [Student(i+1, name) for i, name in enumerate(student_names)]
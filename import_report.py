@@ -0,0 +1,63 @@
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+# Budget for kold import af hvert modul i millisekunder
+DEFAULT_BUDGETS = {
+    "group_formation": 300.0,
+    "app": 1500.0,
+}
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    # Kør i en frisk proces, så intet er cachet i sys.modules
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Kunne ikke importere {module}:\n{result.stderr.strip()}")
+
+    # Underimporter skrives før forælderen og er indrykket med to mellemrum pr. niveau
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        ms = int(cumulative) / 1000
+        if depth == 1:
+            children.append((name.strip(), ms))
+        elif depth == 0:
+            if name.strip() == module:
+                return ms, children
+            children = []
+    raise RuntimeError(f"Fandt ingen importtid for {module}")
+
+
+def print_report(module: str, budget_ms: float, limit: int) -> bool:
+    total, imports = measure_import(module)
+    print(f"{module}: {total:.1f} ms (budget {budget_ms:.0f} ms)")
+    for name, ms in sorted(imports, key=lambda x: x[1], reverse=True)[:limit]:
+        print(f"  {ms:8.1f} ms  {name}")
+    return total <= budget_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Viser importtid for appens moduler mod startbudgettet")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_BUDGETS))
+    parser.add_argument("--budget", type=float, help="Budget i ms for alle angivne moduler")
+    parser.add_argument("--top", type=int, default=10, help="Antal tungeste importer der vises")
+    args = parser.parse_args()
+
+    within_budget = True
+    for module in args.modules:
+        budget = args.budget if args.budget is not None else DEFAULT_BUDGETS.get(module, 1000.0)
+        within_budget = print_report(module, budget, args.top) and within_budget
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import os
+import tempfile
+import threading
+import numpy as np
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: kun låsen i processen beskytter save()
+    fcntl = None
+
+# Navnet, konfigurationen giver elev nr. N, før læreren skriver et rigtigt navn
+DEFAULT_NAME = "Elev {}"
+
+
+class PairingHistory:
+    # Tællinger gemmes som sparse tripletter (række, kolonne, antal) over øvre trekant,
+    # så flere års historik for en hel skole fylder få kB på disk.
+    # Én instans deles af alle sessioner i processen; alle metoder tager derfor låsen.
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.keys: List[str] = []
+        self.runs = 0
+        self._index: Dict[str, int] = {}
+        self._pairs: Dict[Tuple[int, int], int] = {}
+        # Kørsler registreret siden sidste gemning, flettes ind i filen ved save()
+        self._pending: Dict[Tuple[str, str], int] = {}
+        self._pending_runs = 0
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def student_key(student) -> Optional[str]:
+        # Et eksplicit elev-id (fx UNI-login) er den stabile identitet på tværs af terminer.
+        # Uden id bruges navnet uden ekstra mellemrum og store bogstaver, så "Ann" og "ann" er
+        # samme elev. Et uændret standardnavn giver None og indgår hverken i historik eller straf.
+        if student.key:
+            return "id:" + student.key.strip()
+        if student.name == DEFAULT_NAME.format(student.id):
+            return None
+        return " ".join(student.name.split()).casefold() or None
+
+    @classmethod
+    def class_keys(cls, students: List) -> Tuple[List[Optional[str]], List[str]]:
+        # Elever med samme nøgle i én klasse kan ikke skelnes; de udelades (None) og
+        # returneres, så læreren kan give dem hvert sit elev-id
+        keys = [cls.student_key(s) for s in students]
+        duplicates = sorted(key for key, count in Counter(k for k in keys if k).items() if count > 1)
+        skipped = set(duplicates)
+        return [None if key in skipped else key for key in keys], duplicates
+
+    def _key_index(self, key: str) -> int:
+        if key not in self._index:
+            self._index[key] = len(self.keys)
+            self.keys.append(key)
+        return self._index[key]
+
+    def _add_pair(self, key_a: str, key_b: str, count: int) -> None:
+        a, b = sorted((self._key_index(key_a), self._key_index(key_b)))
+        self._pairs[(a, b)] = self._pairs.get((a, b), 0) + count
+
+    def record_groups(self, groups: Iterable) -> List[str]:
+        groups = list(groups)
+        member_keys, duplicates = self.class_keys([m for group in groups for m in group.members])
+        with self._lock:
+            start = 0
+            for group in groups:
+                keys = sorted(key for key in member_keys[start:start + len(group.members)] if key)
+                start += len(group.members)
+                for a in range(len(keys)):
+                    for b in range(a+1, len(keys)):
+                        self._add_pair(keys[a], keys[b], 1)
+                        self._pending[(keys[a], keys[b])] = self._pending.get((keys[a], keys[b]), 0) + 1
+            self.runs += 1
+            self._pending_runs += 1
+        return duplicates
+
+    def _triplets(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if not self._pairs:
+            empty = np.zeros(0, dtype=np.uint32)
+            return empty, empty, np.zeros(0, dtype=np.uint16)
+        pairs = np.array(list(self._pairs.keys()), dtype=np.uint32)
+        counts = np.minimum(np.fromiter(self._pairs.values(), dtype=np.int64, count=len(self._pairs)),
+                            np.iinfo(np.uint16).max).astype(np.uint16)
+        return pairs[:, 0], pairs[:, 1], counts
+
+    def pair_counts(self, students: List) -> np.ndarray:
+        n_students = len(students)
+        matrix = np.zeros((n_students, n_students))
+        keys, _ = self.class_keys(students)
+        with self._lock:
+            if not self._pairs:
+                return matrix
+
+            # Oversæt historikindeks til position i den aktuelle klasse (-1 = ukendt elev)
+            local = np.full(len(self.keys), -1, dtype=np.int64)
+            for position, key in enumerate(keys):
+                index = self._index.get(key) if key else None
+                if index is not None:
+                    local[index] = position
+
+            rows, cols, counts = self._triplets()
+        local_rows = local[rows]
+        local_cols = local[cols]
+        known = (local_rows >= 0) & (local_cols >= 0)
+        matrix[local_rows[known], local_cols[known]] = counts[known]
+        matrix[local_cols[known], local_rows[known]] = counts[known]
+        return matrix
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            raise ValueError("Ingen sti angivet til pardannelseshistorik")
+        # Låsen i processen serialiserer sessionerne; fillåsen serialiserer processer, der deler
+        # filen, så genindlæs-flet-skriv ikke kan overskrive en anden proces' kørsler
+        with self._lock, _file_lock(path):
+            pending, pending_runs = self._pending, self._pending_runs
+            self._pending, self._pending_runs = {}, 0
+            try:
+                self.keys, self.runs, self._index, self._pairs = [], 0, {}, {}
+                if os.path.exists(path):
+                    self.load(path)
+                for (key_a, key_b), count in pending.items():
+                    self._add_pair(key_a, key_b, count)
+                self.runs += pending_runs
+                self._write(path)
+            except BaseException:
+                self._pending, self._pending_runs = pending, pending_runs
+                raise
+            self.path = path
+
+    def _write(self, path: str) -> None:
+        rows, cols, counts = self._triplets()
+        # Unik midlertidig fil i samme mappe, så os.replace er atomisk og samtidige gemninger
+        # ikke skriver i hinandens filer
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    keys=np.array(self.keys, dtype=str),
+                    rows=rows,
+                    cols=cols,
+                    counts=counts,
+                    runs=np.array(self.runs, dtype=np.uint32)
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, path: str) -> None:
+        with self._lock, np.load(path, allow_pickle=False) as data:
+            self.keys = [str(key) for key in data["keys"]]
+            self._index = {key: i for i, key in enumerate(self.keys)}
+            self._pairs = {
+                (int(r), int(c)): int(n)
+                for r, c, n in zip(data["rows"], data["cols"], data["counts"])
+            }
+            self.runs = int(data["runs"])
+            # Lokale kørsler, der endnu ikke er gemt, skal stadig tælle med i straffen
+            for (key_a, key_b), count in self._pending.items():
+                self._add_pair(key_a, key_b, count)
+            self.runs += self._pending_runs
+        self.path = path
+
+
+@contextmanager
+def _file_lock(path: str):
+    # Låsen tages på en separat fil, da selve historikfilen udskiftes med os.replace
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,112 @@
+import numpy as np
+from typing import List
+
+
+def spectral_embedding(score_matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    # Normaliseret Laplace-matrix af de positive parscorer; en lille konstant holder grafen sammenhængende
+    affinity = np.maximum(score_matrix, 0.0) + 1e-6
+    np.fill_diagonal(affinity, 0.0)
+    inv_sqrt_degree = 1.0 / np.sqrt(affinity.sum(axis=1))
+    laplacian = np.eye(len(affinity)) - inv_sqrt_degree[:, None] * affinity * inv_sqrt_degree[None, :]
+
+    _, eigenvectors = np.linalg.eigh(laplacian)
+    embedding = eigenvectors[:, :dimensions]
+    norms = np.linalg.norm(embedding, axis=1, keepdims=True)
+    return embedding / np.where(norms > 0, norms, 1.0)
+
+def squared_distances(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    # |x - c|^2 = |x|^2 - 2 x·c + |c|^2, uden at bygge et (n, k, d)-array
+    return np.maximum((points ** 2).sum(axis=1)[:, None] - 2 * points @ centers.T
+                      + (centers ** 2).sum(axis=1)[None, :], 0.0)
+
+def kmeans(points: np.ndarray, k: int, iterations: int = 20, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # k-means++ initialisering
+    centers = np.empty((k, points.shape[1]))
+    centers[0] = points[rng.integers(len(points))]
+    closest = squared_distances(points, centers[:1])[:, 0]
+    for c in range(1, k):
+        total = closest.sum()
+        centers[c] = points[rng.choice(len(points), p=closest / total if total > 0 else None)]
+        closest = np.minimum(closest, squared_distances(points, centers[c:c+1])[:, 0])
+
+    for _ in range(iterations):
+        labels = squared_distances(points, centers).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, points)
+        nonempty = counts > 0
+        centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centers
+
+def spectral_partition(score_matrix: np.ndarray, max_group_size: int) -> List[List[int]]:
+    n_students = len(score_matrix)
+    k = max(1, -(-n_students // max_group_size))
+    if k == 1:
+        return [list(range(n_students))]
+
+    points = spectral_embedding(score_matrix, k)
+    centers = kmeans(points, k)
+
+    # Fordel eleverne på klyngerne med faste, så vidt muligt lige store pladser,
+    # så ingen gruppe overstiger max_group_size
+    capacity = np.full(k, n_students // k)
+    capacity[:n_students % k] += 1
+    distances = squared_distances(points, centers)
+    labels = np.full(n_students, -1)
+    unassigned = n_students
+    for flat in np.argsort(distances, axis=None):
+        student, cluster = divmod(int(flat), k)
+        if labels[student] < 0 and capacity[cluster] > 0:
+            labels[student] = cluster
+            capacity[cluster] -= 1
+            unassigned -= 1
+            if not unassigned:
+                break
+
+    return [np.flatnonzero(labels == c).tolist() for c in range(k)]
+
+def improve_partition(partition: List[List[int]], score_matrix: np.ndarray,
+                      max_sweeps: int = 50) -> List[List[int]]:
+    # Lokal søgning fra en startløsning: gennemløb eleverne én ad gangen og byt hver elev med den
+    # partner i en anden gruppe, der øger den samlede gruppescore mest. Hvert skridt koster O(n),
+    # så et gennemløb er O(n^2); der stoppes, når et helt gennemløb ikke forbedrer noget.
+    # Gruppestørrelserne bevares.
+    n_students = len(score_matrix)
+    group_of = np.full(n_students, -1)
+    for g, members in enumerate(partition):
+        group_of[members] = g
+    placed = group_of >= 0
+    placed_indices = np.flatnonzero(placed)
+    membership = np.zeros((n_students, len(partition)))
+    membership[placed_indices, group_of[placed]] = 1.0
+
+    # to_group[a, g] = summen af a's parscorer til medlemmerne af gruppe g
+    to_group = score_matrix @ membership
+    # own[a] = a's parscorer til sin egen gruppe
+    own = np.zeros(n_students)
+    own[placed] = to_group[placed_indices, group_of[placed]]
+
+    for _ in range(max_sweeps):
+        improved = False
+        for a in placed_indices:
+            ga = group_of[a]
+            gain = (to_group[a, np.maximum(group_of, 0)] + to_group[:, ga]
+                    - 2 * score_matrix[a] - own[a] - own)
+            gain[(group_of == ga) | ~placed] = -np.inf
+            b = int(np.argmax(gain))
+            if gain[b] <= 1e-9:
+                continue
+
+            gb = group_of[b]
+            to_group[:, ga] += score_matrix[:, b] - score_matrix[:, a]
+            to_group[:, gb] += score_matrix[:, a] - score_matrix[:, b]
+            group_of[a], group_of[b] = gb, ga
+            # Kun medlemmer af de to berørte grupper får ny egen-score
+            changed = (group_of == ga) | (group_of == gb)
+            own[changed] = to_group[changed, group_of[changed]]
+            improved = True
+        if not improved:
+            break
+
+    return [np.flatnonzero(group_of == g).tolist() for g in range(len(partition))]
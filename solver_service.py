@@ -0,0 +1,359 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from group_formation import MAX_GROUP_SIZE, MAX_STUDENTS, GroupFormationSystem
+
+# Lokal HTTP/JSON-tjeneste omkring GroupFormationSystem, så LMS-integrationer kan danne
+# grupper uden en browser. Hvert job kører i sin egen proces, så det kan stoppes ved deadline.
+#
+#   POST /jobs                  -> {"id": ..., "status": ...}   (samme input giver samme job)
+#   GET  /jobs/<id>?wait=<sek>  -> jobstatus, venter op til <sek> på at jobbet bliver færdigt
+#   GET  /jobs/<id>/events      -> server-sent events ved hver statusændring
+
+DEFAULT_DEADLINE = 60.0
+MAX_DEADLINE = 600.0
+MAX_WAIT = 30.0
+# Rigeligt til MAX_STUDENTS elever med navne og præferencer
+MAX_BODY_BYTES = 1024 * 1024
+FINISHED_STATES = ("done", "failed", "timeout")
+
+
+def parse_job(payload: Dict) -> Dict:
+    # Normaliser og valider input; fejl rapporteres som 400 til klienten
+    if not isinstance(payload, dict):
+        raise ValueError("Forventede et JSON-objekt")
+    topics = payload.get("topics")
+    students = payload.get("students")
+    if not isinstance(topics, list) or not topics or not all(isinstance(t, str) for t in topics):
+        raise ValueError("'topics' skal være en ikke-tom liste af tekster")
+    if not isinstance(students, list) or len(students) < 2:
+        raise ValueError("'students' skal være en liste med mindst 2 elever")
+    if len(students) > MAX_STUDENTS:
+        raise ValueError(f"Højst {MAX_STUDENTS} elever pr. job")
+
+    parsed = []
+    for i, student in enumerate(students):
+        if not isinstance(student, dict) or not isinstance(student.get("name"), str):
+            raise ValueError(f"Elev {i+1} mangler 'name'")
+        partners = student.get("partners", [])
+        if not isinstance(partners, list) or not all(
+                isinstance(p, int) and 1 <= p <= len(students) and p != i+1 for p in partners):
+            raise ValueError(f"Elev {i+1} har ugyldige 'partners' (1-baserede elevnumre)")
+        topic = student.get("topic")
+        secondary = student.get("secondary_topic")
+        for value in (topic, secondary):
+            if value is not None and value not in topics:
+                raise ValueError(f"Elev {i+1} har et ukendt emne: {value}")
+        parsed.append({"name": student["name"], "partners": partners,
+                       "topic": topic, "secondary_topic": secondary})
+
+    max_group_size = payload.get("max_group_size", 4)
+    if not isinstance(max_group_size, int) or not 2 <= max_group_size <= MAX_GROUP_SIZE:
+        raise ValueError(f"'max_group_size' skal være et heltal mellem 2 og {MAX_GROUP_SIZE}")
+    deadline = payload.get("deadline", DEFAULT_DEADLINE)
+    if not isinstance(deadline, (int, float)) or deadline <= 0:
+        raise ValueError("'deadline' skal være et positivt antal sekunder")
+
+    return {
+        "topics": topics,
+        "students": parsed,
+        "max_group_size": max_group_size,
+        "deadline": min(float(deadline), MAX_DEADLINE),
+    }
+
+def input_hash(job: Dict) -> str:
+    # Deadline indgår ikke: samme klasse med forskellig tålmodighed er stadig samme opgave
+    problem = {key: value for key, value in job.items() if key != "deadline"}
+    return hashlib.sha256(json.dumps(problem, sort_keys=True).encode("utf-8")).hexdigest()
+
+def solve(job: Dict) -> Dict:
+    students = job["students"]
+    system = GroupFormationSystem(len(students), job["topics"], [s["name"] for s in students])
+    system.max_group_size = job["max_group_size"]
+    for i, student in enumerate(students):
+        system.set_preferences(i+1, student["partners"], student["topic"], student["secondary_topic"])
+
+    groups = system.find_best_groups(system.create_score_matrix())
+    return {
+        "groups": [
+            {"topic": g.topic, "score": g.score, "members": [m.id for m in g.members]}
+            for g in groups
+        ]
+    }
+
+def _run_in_child(conn, job: Dict):
+    try:
+        conn.send(("done", solve(job)))
+    except Exception as e:
+        conn.send(("failed", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+class SolverJob:
+    def __init__(self, job: Dict, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.job = job
+        self.status = "queued"
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.deadline = self.created + job["deadline"]
+        self.version = 0
+
+    def to_dict(self) -> Dict:
+        data = {"id": self.id, "status": self.status}
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+class SolverService:
+    def __init__(self, workers: int = 2, max_queue: int = 100, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, SolverJob]" = OrderedDict()
+        self.by_key: Dict[str, SolverJob] = {}
+        self.changed = threading.Condition()
+        self._queue: "queue.Queue[Optional[SolverJob]]" = queue.Queue(maxsize=max_queue)
+        # spawn i stedet for fork, da serveren er flertrådet
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, payload: Dict) -> Tuple[SolverJob, bool]:
+        job = parse_job(payload)
+        key = input_hash(job)
+        with self.changed:
+            # Samtidige eller gentagne forespørgsler med samme input deler ét job.
+            # Et job, der endnu ikke er færdigt, får den seneste af de to deadlines.
+            existing = self.by_key.get(key)
+            if existing is not None and existing.status not in ("failed", "timeout"):
+                if existing.status not in FINISHED_STATES:
+                    existing.deadline = max(existing.deadline, time.time() + job["deadline"])
+                return existing, False
+
+            solver_job = SolverJob(job, key)
+            try:
+                self._queue.put_nowait(solver_job)
+            except queue.Full:
+                raise OverflowError("Køen er fuld, prøv igen senere")
+            self.jobs[solver_job.id] = solver_job
+            self.by_key[key] = solver_job
+            self._evict()
+            return solver_job, True
+
+    def get(self, job_id: str) -> Optional[SolverJob]:
+        with self.changed:
+            return self.jobs.get(job_id)
+
+    def wait(self, job: SolverJob, timeout: float, seen_version: int = -1) -> int:
+        # Vent til jobbet ændrer sig efter seen_version eller er færdigt
+        end = time.time() + timeout
+        with self.changed:
+            while job.version == seen_version or (seen_version < 0 and job.status not in FINISHED_STATES):
+                remaining = end - time.time()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            return job.version
+
+    def shutdown(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def _evict(self):
+        # Fjern de ældste færdige jobs, når der gemmes for mange
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            job = self.jobs[job_id]
+            if job.status in FINISHED_STATES:
+                del self.jobs[job_id]
+                if self.by_key.get(job.key) is job:
+                    del self.by_key[job.key]
+
+    def _update(self, job: SolverJob, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with self.changed:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.version += 1
+            self.changed.notify_all()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            # En fejl i et enkelt job må aldrig dræbe arbejdertråden
+            try:
+                self._run_job(job)
+            except Exception as e:
+                self._update(job, "failed", error=f"{type(e).__name__}: {e}")
+
+    def _run_job(self, job: SolverJob):
+        remaining = job.deadline - time.time()
+        if remaining <= 0:
+            self._update(job, "timeout", error="Deadline overskredet før jobbet blev startet")
+            return
+
+        self._update(job, "running")
+        parent_conn, child_conn = self._context.Pipe(duplex=False)
+        process = None
+        try:
+            process = self._context.Process(target=_run_in_child, args=(child_conn, job.job), daemon=True)
+            process.start()
+            child_conn.close()
+            # Deadline genlæses løbende, da en sammenlagt forespørgsel kan forlænge den
+            while not parent_conn.poll(min(max(remaining, 0.0), 0.5)):
+                remaining = job.deadline - time.time()
+                if remaining <= 0:
+                    process.terminate()
+                    self._update(job, "timeout", error="Deadline overskredet")
+                    return
+            status, value = parent_conn.recv()
+            if status == "done":
+                self._update(job, "done", result=value)
+            else:
+                self._update(job, "failed", error=value)
+        except EOFError:
+            self._update(job, "failed", error="Løserprocessen stoppede uventet")
+        finally:
+            child_conn.close()
+            parent_conn.close()
+            if process is not None and process.pid is not None:
+                process.join()
+
+
+class SolverRequestHandler(BaseHTTPRequestHandler):
+    service: SolverService = None
+
+    def _send_json(self, status: int, data: Dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path_parts(self) -> List[str]:
+        return [part for part in urlparse(self.path).path.split("/") if part]
+
+    def do_POST(self):
+        if self._path_parts() != ["jobs"]:
+            self._send_json(404, {"error": "Ukendt sti"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "Ugyldig Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"Forespørgslen må højst fylde {MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"null")
+            job, created = self.service.submit(payload)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except OverflowError as e:
+            self._send_json(503, {"error": str(e)})
+            return
+        self._send_json(202 if created else 200, job.to_dict())
+
+    def do_GET(self):
+        parts = self._path_parts()
+        if len(parts) not in (2, 3) or parts[0] != "jobs" or (len(parts) == 3 and parts[2] != "events"):
+            self._send_json(404, {"error": "Ukendt sti"})
+            return
+        job = self.service.get(parts[1])
+        if job is None:
+            self._send_json(404, {"error": "Ukendt job"})
+            return
+
+        if len(parts) == 3:
+            self._stream_events(job)
+            return
+
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            wait = min(float(query.get("wait", ["0"])[0]), MAX_WAIT)
+        except ValueError:
+            self._send_json(400, {"error": "'wait' skal være et tal"})
+            return
+        if wait > 0:
+            self.service.wait(job, wait)
+        with self.service.changed:
+            data = job.to_dict()
+        self._send_json(200, data)
+
+    def _stream_events(self, job: SolverJob):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = -2
+        while True:
+            with self.service.changed:
+                data = job.to_dict()
+                current = job.version
+            if current != version:
+                self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                version = current
+            if data["status"] in FINISHED_STATES:
+                return
+            self.service.wait(job, MAX_WAIT, version)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, workers: int = 2,
+                max_queue: int = 100) -> ThreadingHTTPServer:
+    service = SolverService(workers=workers, max_queue=max_queue)
+    handler = type("BoundSolverRequestHandler", (SolverRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless gruppedannelsestjeneste")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=100)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.workers, args.max_queue)
+    print(f"Lytter på http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import io
+
+import numpy as np
+import pytest
+
+from class_snapshot import ClassSnapshot, DerivedCache
+from group_formation import MAX_GROUP_SIZE, GroupFormationSystem
+
+
+def _system():
+    names = ["Ann", "Bo", "Cy", "Di", "Eva", "Finn", "Gry"]
+    system = GroupFormationSystem(len(names), ["Matematik", "Dansk"], names, student_keys=["a1"] + [""] * 6)
+    system.max_group_size = 3
+    system.repeat_penalty = 1.5
+    for student in system.students[:-1]:
+        partner = student.id % len(names) + 1
+        system.set_preferences(student.id, [partner], "Matematik" if student.id % 2 else "Dansk", "Dansk")
+    return system
+
+
+def _snapshot_bytes():
+    system = _system()
+    groups = system.find_best_groups(system.create_score_matrix())
+    return ClassSnapshot.from_system(system, groups, {1, 2, 3, 4, 5, 6}, groups_recorded=True).to_bytes()
+
+
+def _with_fields(**changes):
+    # Gemmer snapshottet igen med enkelte felter udskiftet (None fjerner feltet)
+    with np.load(io.BytesIO(_snapshot_bytes())) as arrays:
+        fields = {key: arrays[key] for key in arrays.files}
+    for key, value in changes.items():
+        if value is None:
+            del fields[key]
+        else:
+            fields[key] = value
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **fields)
+    return buffer.getvalue()
+
+
+def test_round_trip_restores_class_and_groups():
+    system = _system()
+    groups = system.find_best_groups(system.create_score_matrix())
+    data = ClassSnapshot.from_system(system, groups, {1, 2, 3}, groups_recorded=True).to_bytes()
+
+    snapshot = ClassSnapshot.from_bytes(data)
+    restored = snapshot.to_system()
+    restored_groups = snapshot.to_groups(restored)
+
+    assert [(s.name, s.key, s.preferred_partners, s.preferred_topic, s.secondary_topic) for s in restored.students] == \
+           [(s.name, s.key, s.preferred_partners, s.preferred_topic, s.secondary_topic) for s in system.students]
+    assert (restored.max_group_size, restored.repeat_penalty) == (3, 1.5)
+    assert [([m.id for m in g.members], g.topic, g.score) for g in restored_groups] == \
+           [([m.id for m in g.members], g.topic, g.score) for g in groups]
+    assert snapshot.preferences_set == {1, 2, 3}
+    assert snapshot.groups_recorded
+    assert snapshot.preference_key() == ClassSnapshot.from_system(system).preference_key()
+
+
+def test_snapshot_without_keys_still_loads():
+    snapshot = ClassSnapshot.from_bytes(_with_fields(keys=None))
+    assert all(s.key is None for s in snapshot.to_system().students)
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"ikke et snapshot", "kan ikke læses"),
+    (_with_fields(settings=None), "mangler feltet"),
+    (_with_fields(names=np.array(["Ann"])), "mellem 2 og"),
+    (_with_fields(primary=np.array([0, 1, 5, 0, 1, 0, -1], dtype=np.int16)), "ukendte emnekoder"),
+    (_with_fields(secondary=np.array([0, 1], dtype=np.int16)), "har længde 2"),
+    (_with_fields(partner_offsets=np.array([0, 1, 2, 1, 4, 5, 6, 6], dtype=np.int32)), "ikke-faldende"),
+    (_with_fields(partner_indices=np.array([1, 2, 3, 4, 5, 99], dtype=np.int32)), "uden for"),
+    (_with_fields(group_members=np.array([0, 1, 2, 3, 4, 5, 70], dtype=np.int32)), "uden for"),
+    (_with_fields(group_members=np.array([0, 0, 2, 3, 4, 5, 6], dtype=np.int32)), "flere grupper"),
+    (_with_fields(group_scores=np.array([np.nan, 1.0, 1.0])), "endelige tal"),
+    (_with_fields(names=np.array([1, 2, 3, 4, 5, 6, 7])), "forkert form eller type"),
+    (_with_fields(settings=np.array([3.0, np.nan, 0.0])), "'settings' er ugyldig"),
+    (_with_fields(settings=np.array([3.5, 1.0, 0.0])), "max_group_size"),
+    (_with_fields(settings=np.array([1e6, 1.0, 0.0])), "max_group_size"),
+    (_with_fields(settings=np.array([MAX_GROUP_SIZE + 1, 1.0, 0.0])), "max_group_size"),
+    (_with_fields(settings=np.array([3.0, 1e300, 0.0])), "repeat_penalty"),
+    (_with_fields(settings=np.array([3.0, -1.0, 0.0])), "repeat_penalty"),
+    (_with_fields(keys=np.array(["a1"])), "'keys' har længde 1"),
+])
+def test_invalid_snapshot_is_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        ClassSnapshot.from_bytes(data)
+
+
+def test_derived_cache_evicts_least_recently_used():
+    cache = DerivedCache(max_bytes=3 * 800)
+    computed = []
+
+    def compute(key):
+        def run():
+            computed.append(key)
+            return np.zeros(100)  # 800 bytes
+        return run
+
+    for key in "abc":
+        cache.get(key, compute(key))
+    cache.get("a", compute("a"))  # "a" bliver senest brugt, så "b" er ældst
+    cache.get("d", compute("d"))
+    assert cache.nbytes == 3 * 800
+
+    cache.get("a", compute("a"))
+    cache.get("b", compute("b"))
+    assert computed == ["a", "b", "c", "d", "b"]
+
+
+def test_derived_cache_keeps_single_oversized_entry():
+    cache = DerivedCache(max_bytes=10)
+    value = cache.get("stor", lambda: np.zeros(100))
+    assert cache.get("stor", lambda: np.ones(1)) is value
+    cache.get("ny", lambda: np.zeros(100))
+    assert cache.nbytes == 800
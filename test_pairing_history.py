@@ -0,0 +1,72 @@
+import threading
+
+from group_formation import Group, Student
+from pairing_history import PairingHistory
+
+
+def _students(*names_and_keys):
+    return [Student(i+1, name, key) for i, (name, key) in enumerate(names_and_keys)]
+
+
+def test_explicit_key_survives_renaming():
+    history = PairingHistory()
+    ann, bo = _students(("Ann Hansen", "ah01"), ("Bo", None))
+    history.record_groups([Group([ann, bo], "Matematik", 0.0)])
+
+    renamed = _students(("Ann H.", "ah01"), ("Bo", None))
+    assert history.pair_counts(renamed)[0, 1] == 1
+
+
+def test_name_is_fallback_identity():
+    history = PairingHistory()
+    students = _students(("Ann", None), ("Bo", None))
+    history.record_groups([Group(students, "Matematik", 0.0)])
+    assert history.pair_counts(_students(("  ann ", None), ("BO", None)))[0, 1] == 1
+    # Et id er en anden identitet end navnet
+    assert history.pair_counts(_students(("Ann", "ah01"), ("Bo", None)))[0, 1] == 0
+
+
+def test_duplicate_keys_in_class_are_skipped():
+    history = PairingHistory()
+    ann, ann_lower, bo = _students(("Ann", None), ("ann", None), ("Bo", None))
+    duplicates = history.record_groups([Group([ann, bo], "Matematik", 0.0), Group([ann_lower], "Dansk", 0.0)])
+    assert duplicates == ["ann"]
+    assert history.keys == []
+
+    # Med hvert sit id kan de skelnes
+    ann, ann_lower, bo = _students(("Ann", "a1"), ("ann", "a2"), ("Bo", None))
+    assert history.record_groups([Group([ann, bo], "Matematik", 0.0), Group([ann_lower], "Dansk", 0.0)]) == []
+    counts = history.pair_counts([ann, ann_lower, bo])
+    assert counts[0, 2] == 1 and counts[1, 2] == 0
+
+
+def test_unchanged_default_names_are_not_recorded():
+    history = PairingHistory()
+    # "Elev 3" på plads 1 er et rigtigt navn, "Elev 2" på plads 2 er standardnavnet
+    students = _students(("Elev 3", None), ("Elev 2", None), ("Cy", None))
+    history.record_groups([Group(students, "Matematik", 0.0)])
+    assert history.keys == ["cy", "elev 3"]
+
+
+def test_two_instances_saving_same_file_keep_all_runs(tmp_path):
+    # Hver instans har sin egen lås i processen, så kun fillåsen forhindrer tabte kørsler
+    path = str(tmp_path / "historik.npz")
+    histories = [PairingHistory(path), PairingHistory(path)]
+    students = _students(("Ann", None), ("Bo", None), ("Cy", None))
+
+    def save_runs(history, pair):
+        for _ in range(20):
+            history.record_groups([Group(pair, "Matematik", 0.0)])
+            history.save()
+
+    threads = [threading.Thread(target=save_runs, args=(histories[0], students[:2])),
+               threading.Thread(target=save_runs, args=(histories[1], students[1:]))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = PairingHistory(path)
+    assert merged.runs == 40
+    counts = merged.pair_counts(students)
+    assert counts[0, 1] == 20 and counts[1, 2] == 20 and counts[0, 2] == 0
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from group_formation import GroupFormationSystem
+from seeding import improve_partition, spectral_partition
+
+
+def _score_matrix(n_students, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.random((n_students, n_students)) * (rng.random((n_students, n_students)) < 0.1) * 8
+    matrix = np.triu(matrix, 1)
+    return matrix + matrix.T
+
+
+def _total(partition, score_matrix):
+    return sum(score_matrix[np.ix_(g, g)].sum() / 2 for g in partition)
+
+
+def _system(n_students):
+    system = GroupFormationSystem(n_students, ["Matematik", "Dansk"], [f"Elev {i+1}" for i in range(n_students)])
+    for student in system.students:
+        partner = student.id % n_students + 1
+        system.set_preferences(student.id, [partner], "Matematik" if student.id % 2 else "Dansk")
+    return system
+
+
+@pytest.mark.parametrize("n_students, max_group_size", [(2, 4), (41, 4), (97, 3), (200, 5)])
+def test_spectral_partition_places_each_student_once(n_students, max_group_size):
+    partition = spectral_partition(_score_matrix(n_students), max_group_size)
+    members = sorted(i for group in partition for i in group)
+    assert members == list(range(n_students))
+    assert max(len(group) for group in partition) <= max_group_size
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_improve_partition_never_lowers_score(seed):
+    score_matrix = _score_matrix(120, seed)
+    start = spectral_partition(score_matrix, 4)
+    improved = improve_partition(start, score_matrix)
+    assert _total(improved, score_matrix) >= _total(start, score_matrix) - 1e-9
+    assert sorted(len(g) for g in improved) == sorted(len(g) for g in start)
+    assert sorted(i for group in improved for i in group) == list(range(120))
+
+
+def test_large_class_takes_seeded_path_and_places_everyone():
+    system_size = 60
+    system = _system(system_size)
+    assert system_size > system.seeding_threshold
+    groups = system.find_best_groups(system.create_score_matrix())
+    assert sorted(m.id for g in groups for m in g.members) == list(range(1, system_size + 1))
+    assert max(len(g.members) for g in groups) <= system.max_group_size
+
+
+@pytest.mark.parametrize("partition, message", [
+    ([[0, 1, 2], [3, 4]], "mangler"),
+    ([[0, 1, 2], [2, 3, 4, 5]], "mere end én gang"),
+    ([[0, 1, 2], [3, 4, 9]], "Ukendt elevindeks"),
+    ([[0, 1, 2, 3, 4], [5]], "overstiger max_group_size"),
+])
+def test_invalid_initial_partition_is_rejected(partition, message):
+    system = _system(6)
+    with pytest.raises(ValueError, match=message):
+        system.find_best_groups(system.create_score_matrix(), partition)
@@ -0,0 +1,159 @@
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from group_formation import MAX_GROUP_SIZE, MAX_STUDENTS
+from solver_service import MAX_BODY_BYTES, SolverService, make_server
+
+
+def _payload(**extra):
+    names = ["Ann", "Bo", "Cy", "Di", "Eva", "Finn"]
+    payload = {
+        "topics": ["Matematik", "Dansk"],
+        "students": [
+            {"name": name, "partners": [(i+1) % len(names) + 1], "topic": "Matematik" if i < 3 else "Dansk"}
+            for i, name in enumerate(names)
+        ],
+    }
+    payload.update(extra)
+    return payload
+
+
+@pytest.fixture
+def base_url():
+    server = make_server(port=0, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    server.service.shutdown()
+
+
+def _post(base_url, payload):
+    request = urllib.request.Request(
+        f"{base_url}/jobs",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def _get(base_url, path):
+    with urllib.request.urlopen(f"{base_url}{path}") as response:
+        return json.load(response)
+
+
+def test_identical_requests_are_coalesced(base_url):
+    status, first = _post(base_url, _payload())
+    assert status == 202
+    # Deadline indgår ikke i input-hashen
+    status, second = _post(base_url, _payload(deadline=30))
+    assert status == 200
+    assert second["id"] == first["id"]
+
+
+def test_long_poll_returns_result(base_url):
+    _, job = _post(base_url, _payload())
+    result = _get(base_url, f"/jobs/{job['id']}?wait=20")
+    assert result["status"] == "done"
+    members = sorted(m for group in result["result"]["groups"] for m in group["members"])
+    assert members == [1, 2, 3, 4, 5, 6]
+
+
+def test_deadline_times_out_job(base_url):
+    # Opstart af løserprocessen alene tager længere end deadline
+    _, job = _post(base_url, _payload(deadline=0.01))
+    result = _get(base_url, f"/jobs/{job['id']}?wait=20")
+    assert result["status"] == "timeout"
+
+
+def test_invalid_payload_is_rejected(base_url):
+    status, body = _post(base_url, {"topics": []})
+    assert status == 400
+    assert "error" in body
+
+
+def test_worker_survives_process_start_failure(monkeypatch):
+    service = SolverService(workers=1)
+    try:
+        def fail(*args, **kwargs):
+            raise OSError("for mange åbne filer")
+        monkeypatch.setattr(service._context, "Process", fail)
+        job, _ = service.submit(_payload())
+        service.wait(job, 10)
+        assert job.status == "failed"
+        assert "OSError" in job.error
+
+        # Arbejdertråden lever stadig og tager næste job
+        monkeypatch.undo()
+        job, created = service.submit(_payload())
+        assert created
+        service.wait(job, 20)
+        assert job.status == "done"
+    finally:
+        service.shutdown()
+
+
+def test_oversized_group_is_rejected(base_url):
+    status, body = _post(base_url, _payload(max_group_size=MAX_GROUP_SIZE + 1))
+    assert status == 400
+    assert "max_group_size" in body["error"]
+
+
+def test_too_many_students_is_rejected(base_url):
+    students = [{"name": f"Elev {i}"} for i in range(MAX_STUDENTS + 1)]
+    status, body = _post(base_url, {"topics": ["Matematik"], "students": students})
+    assert status == 400
+    assert str(MAX_STUDENTS) in body["error"]
+
+
+def _post_with_length(base_url, length):
+    # Sender kun headeren; serveren skal afvise uden at læse en krop
+    host, port = base_url.rsplit("/", 1)[1].split(":")
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    try:
+        connection.putrequest("POST", "/jobs")
+        connection.putheader("Content-Type", "application/json")
+        connection.putheader("Content-Length", str(length))
+        connection.endheaders()
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def test_oversized_body_is_rejected(base_url):
+    assert _post_with_length(base_url, MAX_BODY_BYTES + 1) == 413
+
+
+def test_negative_content_length_is_rejected(base_url):
+    assert _post_with_length(base_url, -1) == 400
+
+
+def test_coalesced_request_extends_deadline():
+    # Ingen arbejdere endnu, så det første job venter i køen, mens dets korte deadline udløber
+    service = SolverService(workers=0)
+    worker = threading.Thread(target=service._worker, daemon=True)
+    service._workers.append(worker)
+    try:
+        job, created = service.submit(_payload(deadline=0.01))
+        assert created
+        same_job, created = service.submit(_payload(deadline=60))
+        assert not created and same_job is job
+        assert job.deadline > time.time() + 50
+
+        time.sleep(0.05)
+        worker.start()
+        service.wait(job, 20)
+        assert job.status == "done"
+    finally:
+        service.shutdown()